@@ -1,76 +1,355 @@
 from flask import Flask, render_template, request, send_file
-import pandas as pd
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
+import orjson
+import numpy as np
+from numba import njit, prange
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import os
+import asyncio
+import csv
+import json
+import math
+import hashlib
+import html
 import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import plotly.graph_objs as go
+from plotly.offline import get_plotlyjs_version
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import StrOutputParser
-from xhtml2pdf import pisa
+from weasyprint import HTML
+from weasyprint.text.fonts import FontConfiguration
+from weasyprint.urls import URLFetcher
 from io import BytesIO
-from markupsafe import Markup 
+
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get('sort_keys'):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+app.config['REPORT_CACHE_SIZE'] = 256
+app.config['MAX_SPOOL'] = 5 * 1024 * 1024
+app.config['MAX_GRAPH_POINTS'] = 2000
+app.config['GRAPH_CACHE_SIZE'] = 256
+app.config['JIT_MIN_ROWS'] = 1_000_000
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_BR_LEVEL'] = 5
+Compress(app)
+
+PLOTLY_JS_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+GRAPHS = [
+    ('Time', 'Engine Coolant Temperature [C]', 'Engine Coolant Temperature Over Time', 'Monitors engine warming.'),
+    ('Time', 'Engine RPM [RPM]', 'Engine RPM Over Time', 'Shows engine revolutions per minute during operation.'),
+    ('Time', 'Vehicle Speed Sensor [km/h]', 'Vehicle Speed Over Time', 'Helps assess speed behavior.'),
+    ('Time', 'Accelerator Pedal Position D [%]', 'Pedal D Position Over Time', 'Reflects throttle input from driver.'),
+]
+_GRAPH_POOL = ThreadPoolExecutor(max_workers=len(GRAPHS))
 
 # Load LLM config
 os.environ["OPENAI_API_KEY"] = ""  # Replace with your key
 
+# Kept byte-identical across requests and longer than 1024 tokens so OpenAI's prompt
+# caching can reuse it; only the per-upload summary goes in the user message.
+SYSTEM_PROMPT = """\
+You are an expert vehicle diagnostics assistant. Given raw OBD-II sensor readings, write comprehensive diagnostic reports in a professional tone, similar to what an experienced auto mechanic would write. Your report should include technical insights, inferred issues, possible causes, and preventative advice. Provide detailed explanations with clear reasoning.
+
+Each request contains summarized OBD-II vehicle data recorded over a drive. Based on it, provide a detailed diagnostic report that:
+1. Assesses overall vehicle health.
+2. Identifies anomalies or issues.
+3. Suggests maintenance tips.
+
+INPUT FORMAT
+The data arrives as a CSV block with a metric,value header. The metrics are:
+- coolant_avg_c: average engine coolant temperature in degrees Celsius.
+- rpm_max: highest engine speed observed, in revolutions per minute.
+- rpm_avg: average engine speed, in revolutions per minute.
+- speed_max_kmh: highest vehicle speed reported by the vehicle speed sensor, in km/h.
+- maf_avg_gs: average air flow rate from the mass air flow (MAF) sensor, in grams per second.
+- throttle_max_pct: highest absolute throttle position, in percent.
+- ambient_min_c: lowest ambient air temperature, in degrees Celsius.
+- intake_avg_c: average intake air temperature, in degrees Celsius.
+- pedal_d_min_pct and pedal_d_max_pct: range of accelerator pedal position sensor D, in percent.
+- pedal_e_min_pct and pedal_e_max_pct: range of accelerator pedal position sensor E, in percent.
+Values are averages or extremes over the whole recording, not instantaneous readings. A short trip or a log dominated by idling will skew them, so say so when the numbers suggest it.
+
+DIAGNOSTIC RUBRIC
+Use the following reference ranges for a typical petrol passenger car as a starting point. Adjust for the likely vehicle type and driving conditions, and state your assumptions.
+
+Engine coolant temperature
+- Normal operating range is roughly 85 to 105 C once the engine is warm.
+- An average well below 80 C on a drive longer than fifteen minutes suggests a thermostat stuck open, a faulty coolant temperature sensor, or a log made mostly during warm-up. Related codes: P0128 (coolant thermostat below regulating temperature), P0117 and P0118 (coolant temperature sensor circuit low or high).
+- An average above 105 C, or readings approaching 110 to 115 C, indicates overheating risk: low coolant, a failing water pump, a blocked radiator, a stuck-closed thermostat, or an inoperative cooling fan. Related codes: P0217 (engine overtemperature condition), P0480 to P0483 (cooling fan control).
+
+Engine speed
+- Warm idle is usually 600 to 900 RPM; cold idle may briefly reach 1200 to 1500 RPM.
+- Regular cruising typically sits between 1500 and 3000 RPM.
+- A maximum above 5000 RPM indicates aggressive driving or hard acceleration, which increases wear on the engine, clutch and transmission.
+- An average RPM that is high relative to speed may indicate a slipping clutch or transmission, low gear selection, or excessive idling at elevated RPM. Related codes: P0505 to P0507 (idle control system), P0300 to P0306 (random or cylinder-specific misfire) if RPM is unstable.
+
+Vehicle speed
+- Compare maximum speed with RPM and throttle values to judge the driving pattern: urban, mixed, or highway.
+- A zero or near-zero maximum speed with non-zero RPM means a stationary or idle-only recording.
+- Related codes: P0500 to P0503 (vehicle speed sensor malfunction) if speed is implausible for the RPM and throttle.
+
+Mass air flow
+- At warm idle a MAF reading of roughly 2 to 7 g/s is typical for a 1.5 to 2.5 litre engine. A common rule of thumb is about 0.8 to 1.0 g/s per litre of displacement at idle.
+- Average MAF rises with load and RPM; at highway cruise 15 to 30 g/s is common.
+- A MAF that is low relative to RPM and throttle suggests a dirty or failing MAF sensor, an intake leak after the sensor, or a restricted air filter. Related codes: P0100 to P0104 (MAF circuit), P0171 and P0174 (system too lean).
+- A MAF that is high relative to load may indicate a sensor fault or an unmetered air path. Related codes: P0172 and P0175 (system too rich).
+
+Throttle position
+- Absolute throttle position at closed throttle is usually 10 to 20 percent on drive-by-wire systems, not zero.
+- Wide open throttle typically reads 70 to 90 percent or more.
+- A maximum throttle that stays low suggests gentle driving; consistently high values suggest heavy acceleration.
+- Related codes: P0120 to P0124 (throttle position sensor circuit), P2135 (throttle position sensor correlation).
+
+Ambient and intake air temperature
+- Intake air temperature is normally a few degrees to about 20 C above ambient, depending on engine bay heat, speed, and turbocharging.
+- Intake temperature far above ambient at speed can point to heat soak, an intercooler problem on turbocharged engines, or a misplaced sensor.
+- Very low ambient temperatures explain longer warm-up, higher idle, and lower average coolant temperature.
+- Related codes: P0110 to P0114 (intake air temperature sensor circuit), P0070 to P0073 (ambient air temperature sensor).
+
+Accelerator pedal position
+- Pedal position sensors D and E are redundant sensors on the same pedal. They should move together, although E commonly reads at a fixed ratio, often about half, of D.
+- At rest, each sensor usually reads a small non-zero value; fully pressed, D often reaches 70 to 90 percent.
+- A range that is inconsistent between D and E, values outside 0 to 100 percent, or negative readings suggest sensor wear, wiring faults, or logging errors.
+- Related codes: P2122 to P2128 (pedal position sensor D and E circuits), P2138 (pedal position sensor D/E voltage correlation).
+
+REPORT STRUCTURE
+Organize the report under these headings, in order:
+1. Overall Health Assessment: a short verdict and the main reasons for it.
+2. Observations by System: coolant, engine speed, air flow and intake, throttle and pedal, with the relevant values quoted.
+3. Anomalies and Possible Causes: each finding, its likely causes from most to least probable, and related diagnostic trouble codes to check.
+4. Recommended Actions: inspections or repairs, ordered by urgency.
+5. Preventative Maintenance: general advice appropriate to what the data shows.
+
+GUIDELINES
+- Base every conclusion on the values provided; do not invent readings that are not in the data.
+- When the data is insufficient to confirm a fault, say what additional test or reading would confirm it.
+- Distinguish clearly between confirmed abnormalities, possible concerns, and normal behavior.
+- Write plain text without Markdown tables. Keep units with every number you quote.
+"""
+
 prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are an expert vehicle diagnostics assistant. Given raw OBD-II sensor readings, write comprehensive diagnostic reports in a professional tone, similar to what an experienced auto mechanic would write. Your report should include technical insights, inferred issues, possible causes, and preventative advice. Provide detailed explanations with clear reasoning."),
-    ("user", "Question: {question}")
+    ("system", SYSTEM_PROMPT),
+    ("user", "{question}")
 ])
 
-def summarize_data(df):
-    df.columns = df.columns.str.encode('ascii', 'ignore').str.decode('ascii').str.strip()
+# Built once per process and reused by every request. Creation is deferred until first
+# use so a preloading server (see gunicorn.conf.py) never shares the client's sockets
+# across forked workers.
+_chain = None
+_chain_pid = None
+_chain_lock = threading.Lock()
+
+def get_chain():
+    global _chain, _chain_pid
+    with _chain_lock:
+        if _chain_pid != os.getpid():
+            llm = ChatOpenAI(
+                model="gpt-3.5-turbo",
+                temperature=0.7,
+                max_tokens=1024,
+                http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=20)),
+            )
+            _chain = prompt | llm | StrOutputParser()
+            _chain_pid = os.getpid()
+    return _chain
+
+SENSOR_COLUMNS = [
+    'Engine Coolant Temperature [C]',
+    'Engine RPM [RPM]',
+    'Vehicle Speed Sensor [km/h]',
+    'Air Flow Rate from Mass Flow Sensor [g/s]',
+    'Absolute Throttle Position [%]',
+    'Ambient Air Temperature [C]',
+    'Intake Air Temperature [C]',
+    'Accelerator Pedal Position D [%]',
+    'Accelerator Pedal Position E [%]',
+]
+NEEDED_COLUMNS = ['Time'] + SENSOR_COLUMNS
+# Declared up front so the reader skips type inference and decodes straight to float32
+COLUMN_TYPES = {col: pa.float32() for col in SENSOR_COLUMNS}
+_COL = {name: i for i, name in enumerate(SENSOR_COLUMNS)}
+
+@lru_cache(maxsize=32)
+def clean_column_names(header_line):
+    # Every byte of a multi-byte UTF-8 character is non-ASCII, so decoding the raw
+    # header as ASCII drops those characters in a single pass
+    return [name.strip() for name in next(csv.reader([header_line.decode('ascii', 'ignore')]))]
+
+def read_csv_table(source, header_line):
+    # Header names are cleaned up front so only the columns we use get parsed
+    return pacsv.read_csv(
+        source,
+        read_options=pacsv.ReadOptions(skip_rows=1, column_names=clean_column_names(header_line)),
+        convert_options=pacsv.ConvertOptions(include_columns=NEEDED_COLUMNS, column_types=COLUMN_TYPES),
+    )
+
+def upload_digest(stream, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def read_upload(file):
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    header_line = stream.readline()
+    stream.seek(0)
+    if size <= app.config['MAX_SPOOL']:
+        return read_csv_table(stream, header_line)
+    # Large uploads go to disk and are parsed from a memory map
+    # Each upload gets its own file; a shared name would let a concurrent save
+    # truncate a file another request still has mapped
+    fd, file_path = tempfile.mkstemp(suffix='.csv', dir=app.config['UPLOAD_FOLDER'])
+    try:
+        with os.fdopen(fd, 'wb') as dest:
+            file.save(dest)
+        with pa.memory_map(file_path) as source:
+            return read_csv_table(source, header_line)
+    finally:
+        os.remove(file_path)
+
+# Numba's fallback workqueue threading layer aborts the process if two threads
+# enter a parallel region at once, so kernel calls are serialized. Each call
+# already spreads across all cores.
+_aggregate_lock = threading.Lock()
+
+@njit(parallel=True, cache=True)
+def _aggregate(arr):
+    # Fused min/max/mean sweep, one column per thread so no accumulator is shared
+    k, n = arr.shape
+    mins = np.full(k, np.nan)
+    maxs = np.full(k, np.nan)
+    means = np.full(k, np.nan)
+    for j in prange(k):
+        lo = np.inf
+        hi = -np.inf
+        total = 0.0
+        count = 0
+        for i in range(n):
+            v = arr[j, i]
+            if np.isnan(v):
+                continue
+            if v < lo:
+                lo = v
+            if v > hi:
+                hi = v
+            total += v
+            count += 1
+        if count:
+            mins[j] = lo
+            maxs[j] = hi
+            means[j] = total / count
+    return mins, maxs, means
+
+def summarize_data(table):
+    # One float32 block and a single reduction per statistic instead of a pass per column
+    arr = np.vstack([table.column(col).to_numpy() for col in SENSOR_COLUMNS])
+    if arr.shape[1] >= app.config['JIT_MIN_ROWS']:
+        with _aggregate_lock:
+            mins, maxs, means = _aggregate(arr)
+    else:
+        mins = np.nanmin(arr, axis=1)
+        maxs = np.nanmax(arr, axis=1)
+        means = np.nanmean(arr, axis=1, dtype=np.float64)
+    # Whole units for temperatures, RPM and speed, one decimal elsewhere; finer
+    # precision means nothing diagnostically and only costs prompt tokens
+    def stat(values, col, ndigits=None):
+        value = float(values[_COL[col]])
+        # An empty or unsupported sensor column reduces to NaN, which has no integer form
+        if not math.isfinite(value):
+            return value
+        return round(value, ndigits)
+
     summary = {
-        'engine_temp_avg': round(df['Engine Coolant Temperature [C]'].mean(), 2),
-        'rpm_max': int(df['Engine RPM [RPM]'].max()),
-        'rpm_avg': int(df['Engine RPM [RPM]'].mean()),
-        'speed_max': int(df['Vehicle Speed Sensor [km/h]'].max()),
-        'maf_avg': round(df['Air Flow Rate from Mass Flow Sensor [g/s]'].mean(), 2),
-        'throttle_max': round(df['Absolute Throttle Position [%]'].max(), 2),
-        'ambient_min': round(df['Ambient Air Temperature [C]'].min(), 2),
-        'intake_temp_avg': round(df['Intake Air Temperature [C]'].mean(), 2),
-        'pedal_d_range': (df['Accelerator Pedal Position D [%]'].min(), df['Accelerator Pedal Position D [%]'].max()),
-        'pedal_e_range': (df['Accelerator Pedal Position E [%]'].min(), df['Accelerator Pedal Position E [%]'].max())
+        'engine_temp_avg': stat(means, 'Engine Coolant Temperature [C]'),
+        'rpm_max': stat(maxs, 'Engine RPM [RPM]'),
+        'rpm_avg': stat(means, 'Engine RPM [RPM]'),
+        'speed_max': stat(maxs, 'Vehicle Speed Sensor [km/h]'),
+        'maf_avg': stat(means, 'Air Flow Rate from Mass Flow Sensor [g/s]', 1),
+        'throttle_max': stat(maxs, 'Absolute Throttle Position [%]', 1),
+        'ambient_min': stat(mins, 'Ambient Air Temperature [C]'),
+        'intake_temp_avg': stat(means, 'Intake Air Temperature [C]'),
+        'pedal_d_min': stat(mins, 'Accelerator Pedal Position D [%]', 1),
+        'pedal_d_max': stat(maxs, 'Accelerator Pedal Position D [%]', 1),
+        'pedal_e_min': stat(mins, 'Accelerator Pedal Position E [%]', 1),
+        'pedal_e_max': stat(maxs, 'Accelerator Pedal Position E [%]', 1)
     }
     return summary
 
-def build_question(summary):
-    return f"""
-Based on the summarized OBD-II vehicle data over time, provide a detailed diagnostic report:
-1. Assess overall vehicle health.
-2. Identify anomalies or issues.
-3. Suggest maintenance tips.
-
-Data Summary:
-- Avg Engine Coolant Temp: {summary['engine_temp_avg']} °C
-- Max Engine RPM: {summary['rpm_max']} RPM
-- Avg Engine RPM: {summary['rpm_avg']} RPM
-- Max Speed: {summary['speed_max']} km/h
-- Avg Air Flow (MAF): {summary['maf_avg']} g/s
-- Max Throttle: {summary['throttle_max']} %
-- Min Ambient Temp: {summary['ambient_min']} °C
-- Avg Intake Air Temp: {summary['intake_temp_avg']} °C
-- Pedal D: {summary['pedal_d_range'][0]}% to {summary['pedal_d_range'][1]}%
-- Pedal E: {summary['pedal_e_range'][0]}% to {summary['pedal_e_range'][1]}%
+_QUESTION_TEMPLATE = """metric,value
+coolant_avg_c,{engine_temp_avg}
+rpm_max,{rpm_max}
+rpm_avg,{rpm_avg}
+speed_max_kmh,{speed_max}
+maf_avg_gs,{maf_avg}
+throttle_max_pct,{throttle_max}
+ambient_min_c,{ambient_min}
+intake_avg_c,{intake_temp_avg}
+pedal_d_min_pct,{pedal_d_min}
+pedal_d_max_pct,{pedal_d_max}
+pedal_e_min_pct,{pedal_e_min}
+pedal_e_max_pct,{pedal_e_max}
 """
 
+def build_question(summary):
+    return _QUESTION_TEMPLATE.format_map(summary)
+
 def generate_report(question):
-    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, max_tokens=1024)
-    chain = prompt | llm | StrOutputParser()
-    raw_report = chain.invoke({"question": question})
-    formatted_report = f"""
+    # Escaped once here so the page can render the report with |safe
+    raw_report = html.escape(get_chain().invoke({"question": question}))
+    return f"""
     <div style='border:2px solid #007BFF; padding:20px; background-color:#F8F9FA; border-radius:10px;'>
         <h3 style='color:#007BFF;'>Vehicle Diagnostic Report</h3>
         <p style='white-space:pre-wrap;'>{raw_report}</p>
     </div>
     """
-    return Markup(formatted_report)
 
-def generate_summary_table(summary):
-    table_html = """
+# Reports keyed by a hash of the (rounded) summary, so repeat uploads skip the LLM call
+_report_cache = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+def summary_key(summary):
+    payload = json.dumps({k: round(float(v), 1) for k, v in summary.items()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_report(summary, use_cache=True):
+    key = summary_key(summary)
+    if use_cache:
+        with _report_cache_lock:
+            if key in _report_cache:
+                _report_cache.move_to_end(key)
+                return _report_cache[key]
+    report = generate_report(build_question(summary))
+    with _report_cache_lock:
+        _report_cache[key] = report
+        if len(_report_cache) > app.config['REPORT_CACHE_SIZE']:
+            _report_cache.popitem(last=False)
+    return report
+
+_TABLE_HEAD = """
     <table style='width:100%; border-collapse: collapse; margin-bottom: 20px;'>
         <thead>
             <tr style='background-color:#007BFF; color:white;'>
@@ -79,33 +358,75 @@ def generate_summary_table(summary):
             </tr>
         </thead>
         <tbody>
-            <tr><td>Avg Engine Coolant Temp</td><td>{engine_temp_avg} °C</td></tr>
-            <tr><td>Max Engine RPM</td><td>{rpm_max} RPM</td></tr>
-            <tr><td>Avg Engine RPM</td><td>{rpm_avg} RPM</td></tr>
-            <tr><td>Max Speed</td><td>{speed_max} km/h</td></tr>
-            <tr><td>Avg Air Flow (MAF)</td><td>{maf_avg} g/s</td></tr>
-            <tr><td>Max Throttle Position</td><td>{throttle_max} %</td></tr>
-            <tr><td>Min Ambient Temp</td><td>{ambient_min} °C</td></tr>
-            <tr><td>Avg Intake Air Temp</td><td>{intake_temp_avg} °C</td></tr>
-            <tr><td>Pedal D Range</td><td>{pedal_d_range[0]}% - {pedal_d_range[1]}%</td></tr>
-            <tr><td>Pedal E Range</td><td>{pedal_e_range[0]}% - {pedal_e_range[1]}%</td></tr>
+"""
+_TABLE_TAIL = """
         </tbody>
     </table>
-    """.format(**summary)
-    return Markup(table_html)
+"""
+_TABLE_ROWS = [
+    ("Avg Engine Coolant Temp", "engine_temp_avg", "°C"),
+    ("Max Engine RPM", "rpm_max", "RPM"),
+    ("Avg Engine RPM", "rpm_avg", "RPM"),
+    ("Max Speed", "speed_max", "km/h"),
+    ("Avg Air Flow (MAF)", "maf_avg", "g/s"),
+    ("Max Throttle Position", "throttle_max", "%"),
+    ("Min Ambient Temp", "ambient_min", "°C"),
+    ("Avg Intake Air Temp", "intake_temp_avg", "°C"),
+]
+_RANGE_ROWS = [
+    ("Pedal D Range", "pedal_d_min", "pedal_d_max"),
+    ("Pedal E Range", "pedal_e_min", "pedal_e_max"),
+]
+
+def generate_summary_table(summary):
+    rows = [f"<tr><td>{label}</td><td>{summary[key]} {unit}</td></tr>" for label, key, unit in _TABLE_ROWS]
+    rows += [f"<tr><td>{label}</td><td>{summary[lo]}% - {summary[hi]}%</td></tr>" for label, lo, hi in _RANGE_ROWS]
+    return _TABLE_HEAD + "".join(rows) + _TABLE_TAIL
+
+def _downsample(x, y, max_points):
+    # Stride the Series before converting, so only the kept points are ever
+    # materialized; a string Time column would otherwise become a full object array
+    step = max(1, -(-len(x) // max_points))
+    return x.iloc[::step].to_numpy(), y.iloc[::step].to_numpy()
+
+# Graph JSON is memoized per (upload digest, column), so re-uploading the same file
+# skips figure construction and serialization
+_graph_cache = OrderedDict()
+_graph_cache_lock = threading.Lock()
 
-def create_graph(df, x_col, y_col, title, explanation):
+def create_graph(df, digest, x_col, y_col, title, explanation):
+    key = (digest, x_col, y_col, title)
+    with _graph_cache_lock:
+        if key in _graph_cache:
+            _graph_cache.move_to_end(key)
+            return _graph_cache[key], explanation
+    x, y = _downsample(df[x_col], df[y_col], app.config['MAX_GRAPH_POINTS'])
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df[x_col], y=df[y_col], mode='lines', name=y_col))
+    fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=y_col))
     fig.update_layout(title=title, xaxis_title='Timestamp', yaxis_title=y_col)
-    graph_html = fig.to_html(full_html=False)
-    return graph_html, explanation
+    graph_json = fig.to_json(engine='orjson')
+    with _graph_cache_lock:
+        _graph_cache[key] = graph_json
+        if len(_graph_cache) > app.config['GRAPH_CACHE_SIZE']:
+            _graph_cache.popitem(last=False)
+    return graph_json, explanation
+
+# Font discovery is expensive, so one configuration is shared by every render
+_FONT_CONFIG = FontConfiguration()
+# The posted HTML is client-controlled and the report only uses inline styles, so
+# every external fetch is refused; otherwise <img src="file:..."> or
+# <link rel="attachment"> could pull server files into the PDF
+_URL_FETCHER = URLFetcher(allowed_protocols=())
 
 def create_pdf(report_html):
-    pdf_buffer = BytesIO()
-    pisa_status = pisa.CreatePDF(report_html, dest=pdf_buffer)
-    if pisa_status.err:
+    # Layout happens up front so a failure can still become an error response
+    try:
+        document = HTML(string=report_html, url_fetcher=_URL_FETCHER).render(font_config=_FONT_CONFIG)
+    except Exception:
+        app.logger.exception("Failed to generate PDF")
         return None
+    pdf_buffer = BytesIO()
+    document.write_pdf(target=pdf_buffer)
     pdf_buffer.seek(0)
     return pdf_buffer
 
@@ -114,29 +435,34 @@ def index():
     return render_template("index.html")
 
 @app.route('/generate', methods=['POST'])
-def generate():
+async def generate():
     file = request.files['datafile']
     if not file:
         return "No file uploaded", 400
 
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-    file.save(file_path)
-    df = pd.read_csv(file_path)
-
-    summary = summarize_data(df)
-    question = build_question(summary)
-    report = generate_report(question)
-
-    # Graphs
-    graphs = []
-    graphs.append(create_graph(df, 'Time', 'Engine Coolant Temperature [C]', 'Engine Coolant Temperature Over Time', 'Monitors engine warming.'))
-    graphs.append(create_graph(df, 'Time', 'Engine RPM [RPM]', 'Engine RPM Over Time', 'Shows engine revolutions per minute during operation.'))
-    graphs.append(create_graph(df, 'Time', 'Vehicle Speed Sensor [km/h]', 'Vehicle Speed Over Time', 'Helps assess speed behavior.'))
-    graphs.append(create_graph(df, 'Time', 'Accelerator Pedal Position D [%]', 'Pedal D Position Over Time', 'Reflects throttle input from driver.'))
-    
+    digest = upload_digest(file.stream)
+    table = read_upload(file)
+
+    summary = summarize_data(table)
+    df = table.to_pandas(self_destruct=True)
+    use_cache = request.args.get('nocache') != '1'
+
+    # The LLM call is mostly network wait, so it runs alongside the graph rendering
+    loop = asyncio.get_running_loop()
+    pending = [asyncio.ensure_future(asyncio.to_thread(get_report, summary, use_cache))]
+    pending += [loop.run_in_executor(_GRAPH_POOL, create_graph, df, digest, *spec) for spec in GRAPHS]
+    try:
+        report, *graphs = await asyncio.gather(*pending)
+    except Exception:
+        # Settle the rest so nothing is left pending when the request's event loop closes
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
+
     summary_table = generate_summary_table(summary)
 
-    return render_template("result.html", report=report, graphs=graphs, summary_table=summary_table)
+    return render_template("result.html", report=report, graphs=graphs, summary_table=summary_table, plotly_js_url=PLOTLY_JS_URL)
 
 @app.route('/download', methods=['POST'])
 def download():
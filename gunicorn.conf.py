@@ -0,0 +1,8 @@
+# Production server settings, picked up automatically by: gunicorn app:app
+# The app is imported once in the master and forked, so the heavy imports are
+# paid once and shared copy-on-write between workers.
+bind = "0.0.0.0:8000"
+preload_app = True
+workers = 4
+worker_class = "gthread"
+threads = 8